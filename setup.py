@@ -5,10 +5,14 @@ SynapseWatcher - Setup Script
 Installation:
     pip install -e .
 
+Optional compiled build (mypyc, needs mypy installed):
+    SYNAPSEWATCHER_COMPILE=1 pip install --no-build-isolation .
+
 Usage after installation:
     synapsewatcher --help
 """
 
+import os
 from setuptools import setup, find_packages
 from pathlib import Path
 
@@ -18,6 +22,13 @@ long_description = ""
 if readme_path.exists():
     long_description = readme_path.read_text(encoding="utf-8")
 
+# Compile the module to a C extension with mypyc when asked to;
+# the pure-Python module is installed otherwise
+ext_modules = []
+if os.environ.get("SYNAPSEWATCHER_COMPILE") == "1":
+    from mypyc.build import mypycify
+    ext_modules = mypycify(["synapsewatcher.py"])
+
 setup(
     name="synapsewatcher",
     version="1.1.0",
@@ -28,8 +39,14 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/DonkRonk17/SynapseWatcher",
     py_modules=["synapsewatcher"],
+    ext_modules=ext_modules,
     python_requires=">=3.7",
     install_requires=[],  # Zero dependencies - pure stdlib!
+    extras_require={
+        # Faster JSON parsing and keyword matching. orjson reads integers
+        # wider than 64 bits as floats, losing precision.
+        "fast": ["orjson", "pyahocorasick"],
+    },
     entry_points={
         "console_scripts": [
             "synapsewatcher=synapsewatcher:main",
@@ -4,8 +4,11 @@ SynapseWatcher v1.0 - Test Suite
 Tests for the SynapseWatcher real-time notification system.
 """
 
+import os
 import sys
 import json
+import asyncio
+import logging
 import time
 from pathlib import Path
 import tempfile
@@ -14,7 +17,7 @@ import shutil
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-from synapsewatcher import SynapseWatcher, MessageFilter, SynapseMessage
+from synapsewatcher import SynapseWatcher, MessageFilter, SynapseMessage, MultiSourceWatcher
 
 
 class TestResults:
@@ -98,9 +101,33 @@ def test_message_loading():
         # Verify
         results.assert_equal(message.msg_id, "test_msg_001", "Message ID correct")
         results.assert_equal(message.from_agent, "FORGE", "From agent correct")
-        results.assert_equal(message.to, ["ATLAS"], "To agents correct")
+        results.assert_equal(message.to, ("ATLAS",), "To agents correct")
         results.assert_equal(message.subject, "Test Subject", "Subject correct")
         results.assert_equal(message.priority, "HIGH", "Priority correct")
+        
+        # Large message
+        filepath = create_test_message(temp_path, "test_msg_big", body={"message": "x" * 100_000})
+        big = SynapseMessage.from_file(filepath)
+        results.assert_equal(len(big.body["message"]), 100_000, "Large message body loaded")
+        
+        # Non-standard JSON the stdlib accepts loads with or without orjson
+        filepath = temp_path / "test_msg_nan.json"
+        filepath.write_text('{"msg_id": "test_msg_nan", "body": {"score": NaN, "max": Infinity}}',
+                            encoding='utf-8')
+        body = SynapseMessage.from_file(filepath).body
+        results.assert_true(body["score"] != body["score"] and body["max"] == float("inf"),
+                            "NaN/Infinity body loaded")
+        
+        # Single recipient given as a plain string
+        filepath = create_test_message(temp_path, "test_msg_001b", to="ATLAS")
+        results.assert_equal(SynapseMessage.from_file(filepath).to, ("ATLAS",), "String recipient normalized")
+        
+        # Messages are immutable
+        try:
+            message.subject = "Changed"
+            results.assert_true(False, "Message is immutable")
+        except AttributeError:
+            results.assert_true(True, "Message is immutable")
     
     return results.summary()
 
@@ -134,6 +161,10 @@ def test_message_filter():
         filter2 = MessageFilter(to_agent="CLIO")
         results.assert_true(not filter2.matches(message), "Filter rejects to_agent=CLIO")
         
+        # Test 2b: Broadcast messages match any to_agent
+        broadcast = SynapseMessage.from_file(create_test_message(temp_path, "test_msg_002b", to="ALL_AGENTS"))
+        results.assert_true(filter2.matches(broadcast), "Filter matches broadcast to ALL_AGENTS")
+        
         # Test 3: Filter by from_agent (match)
         filter3 = MessageFilter(from_agent="FORGE")
         results.assert_true(filter3.matches(message), "Filter matches from_agent=FORGE")
@@ -150,6 +181,15 @@ def test_message_filter():
         filter6 = MessageFilter(keywords=["happy", "sunshine"])
         results.assert_true(not filter6.matches(message), "Filter rejects non-matching keywords")
         
+        # Test 6b: Keywords are case-insensitive and search text is built once
+        filter6b = MessageFilter(keywords=["DATABASE"])
+        results.assert_true(filter6b.matches(message), "Filter matches keywords case-insensitively")
+        results.assert_true(message.search_text is message.search_text, "Search text cached on message")
+        
+        # Test 6c: Keywords are matched literally, not as patterns
+        filter6c = MessageFilter(keywords=["conn.ction", "fail(ed"])
+        results.assert_true(not filter6c.matches(message), "Filter treats keywords literally")
+        
         # Test 7: Multiple filters (match all)
         filter7 = MessageFilter(
             to_agent="ATLAS",
@@ -164,6 +204,50 @@ def test_message_filter():
             priority="LOW"
         )
         results.assert_true(not filter8.matches(message), "Multiple filters reject when one fails")
+        
+        # Test 9: Criteria are read-only, so matches() and prefilter can't disagree
+        try:
+            filter8.priority = "CRITICAL"
+            results.assert_true(False, "Filter criteria are read-only")
+        except AttributeError:
+            results.assert_true(True, "Filter criteria are read-only")
+        filter5.keywords.append("database")
+        results.assert_equal(filter5.keywords, ["urgent", "system"], "Keyword list is a copy")
+    
+    return results.summary()
+
+
+def test_message_prefilter():
+    """Test header-only prefiltering of large messages."""
+    print("\n[TEST] Message Prefilter")
+    results = TestResults()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        
+        # Body large enough to be prefiltered; only the header fits in the read
+        big_body = {"message": "x" * 40_000}
+        big = create_test_message(
+            temp_path,
+            "prefilter_big",
+            from_agent="FORGE",
+            to=["BOLT"],
+            priority="HIGH",
+            body=big_body
+        )
+        small = create_test_message(temp_path, "prefilter_small", to=["BOLT"])
+        
+        results.assert_true(not MessageFilter(to_agent="ATLAS").prefilter(big), "Prefilter rejects to_agent=ATLAS")
+        results.assert_true(MessageFilter(to_agent="BOLT").prefilter(big), "Prefilter keeps to_agent=BOLT")
+        results.assert_true(not MessageFilter(priority="LOW").prefilter(big), "Prefilter rejects priority=LOW")
+        results.assert_true(MessageFilter(from_agent="FORGE").prefilter(big), "Prefilter keeps from_agent=FORGE")
+        results.assert_true(MessageFilter(keywords=["nope"]).prefilter(big), "Prefilter defers keyword checks")
+        results.assert_true(MessageFilter(to_agent="ATLAS").prefilter(small), "Prefilter defers small messages")
+        
+        # Fields after the body can't be seen, so nothing is rejected
+        body_first = temp_path / "prefilter_body_first.json"
+        body_first.write_text(json.dumps({"body": big_body, "to": ["BOLT"]}), encoding='utf-8')
+        results.assert_true(MessageFilter(to_agent="ATLAS").prefilter(body_first), "Prefilter keeps unseen fields")
     
     return results.summary()
 
@@ -253,6 +337,118 @@ def test_deduplication():
     return results.summary()
 
 
+def test_seen_cache_bounded():
+    """Test that the seen cache is bounded without re-sending messages still on disk."""
+    print("\n[TEST] Bounded Seen Cache")
+    results = TestResults()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        watcher = SynapseWatcher(synapse_path=Path(temp_dir), max_seen=3)
+        
+        for i in range(5):
+            watcher._mark_seen(f"msg_{i}")
+        
+        results.assert_equal(len(watcher.seen_messages), 3, "Cache capped at max_seen")
+        results.assert_true("msg_0" not in watcher.seen_messages, "Oldest ID evicted")
+        results.assert_true("msg_4" in watcher.seen_messages, "Newest ID retained")
+        results.assert_true(not watcher._mark_seen("msg_4"), "Seen ID not reported as new")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        
+        # More messages on disk than max_seen: full scans must not forget any
+        for i in range(12):
+            create_test_message(temp_path, f"bounded_test_{i:02d}")
+        
+        watcher = SynapseWatcher(synapse_path=temp_path, max_seen=10)
+        callback_calls = []
+        watcher.register_callback(lambda message: callback_calls.append(message.msg_id))
+        
+        watcher._mark_existing_seen()
+        watcher._scan_and_dispatch()
+        watcher._scan_and_dispatch()
+        results.assert_equal(callback_calls, [], "Full folder never re-delivered past max_seen")
+        
+        # Deleted messages leave the cache; new ones are still picked up
+        (temp_path / "bounded_test_00.json").unlink()
+        create_test_message(temp_path, "bounded_test_12")
+        watcher._scan_and_dispatch()
+        results.assert_equal(callback_calls, ["bounded_test_12"], "New message delivered once")
+        results.assert_equal(len(watcher.seen_messages), 12, "Cache tracks folder contents")
+    
+    return results.summary()
+
+
+def test_polling_scan():
+    """Test the directory-scan path used when inotify is unavailable."""
+    print("\n[TEST] Polling Scan")
+    results = TestResults()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        
+        watcher = SynapseWatcher(synapse_path=temp_path, poll_interval=0.1)
+        
+        callback_calls = []
+        
+        def test_callback(message):
+            callback_calls.append(message.msg_id)
+        
+        watcher.register_callback(test_callback)
+        
+        # Written in the opposite order to their names
+        older = create_test_message(temp_path, "scan_test_b")
+        newer = create_test_message(temp_path, "scan_test_a")
+        os.utime(older, ns=(1_000_000_000, 1_000_000_000))
+        os.utime(newer, ns=(2_000_000_000, 2_000_000_000))
+        (temp_path / "notes.txt").write_text("not a message", encoding='utf-8')
+        
+        watcher._scan_and_dispatch()
+        watcher._scan_and_dispatch()
+        
+        results.assert_equal(callback_calls, ["scan_test_b", "scan_test_a"],
+                             "Scan dispatches new messages once, oldest first")
+        
+        # Folder mtime gate: settled and unchanged means no rescan
+        os.utime(temp_path, ns=(3_000_000_000, 3_000_000_000))
+        results.assert_true(watcher._folder_changed(), "Gate opens on first check")
+        results.assert_true(not watcher._folder_changed(), "Gate closed while folder unchanged")
+        
+        # A fresh mtime may hide a same-tick write, so it keeps the gate open
+        create_test_message(temp_path, "scan_test_c")
+        results.assert_true(watcher._folder_changed(), "Gate opens after new file")
+        results.assert_true(watcher._folder_changed(), "Gate stays open until mtime settles")
+        
+        # A failed scan doesn't close the gate on a settled folder
+        os.utime(temp_path, ns=(4_000_000_000, 4_000_000_000))
+        real_scandir = os.scandir
+        def failing_scandir(path):
+            os.scandir = real_scandir
+            raise OSError(5, "Input/output error")
+        os.scandir = failing_scandir
+        try:
+            watcher._poll_once()
+        finally:
+            os.scandir = real_scandir
+        watcher._poll_once()
+        results.assert_equal(callback_calls[-1], "scan_test_c", "Scan retried after a failed one")
+        
+        # A file that can't be read isn't left marked as seen
+        watcher._mark_seen("scan_test_gone")
+        watcher._process_message("scan_test_gone.json")
+        results.assert_true("scan_test_gone" not in watcher.seen_messages, "Unreadable file forgotten")
+        
+        # Folder replaced while watched: its new contents are picked up
+        shutil.move(str(temp_path), temp_dir + "_old")
+        temp_path.mkdir()
+        create_test_message(temp_path, "scan_test_d")
+        watcher._scan_and_dispatch()
+        shutil.rmtree(temp_dir + "_old")
+        results.assert_equal(callback_calls[-1], "scan_test_d", "Replaced folder scanned by path")
+    
+    return results.summary()
+
+
 def test_error_handling():
     """Test graceful handling of errors."""
     print("\n[TEST] Error Handling")
@@ -300,6 +496,292 @@ def test_error_handling():
     return results.summary()
 
 
+def test_concurrent_callbacks():
+    """Test concurrent callbacks (opt-in) and serial ordering by default."""
+    print("\n[TEST] Concurrent Callbacks")
+    results = TestResults()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        
+        watcher = SynapseWatcher(synapse_path=temp_path, poll_interval=0.1, callback_workers=4)
+        
+        callback_calls = []
+        
+        def slow_callback(message):
+            time.sleep(0.5)
+            callback_calls.append(message.msg_id)
+        
+        watcher.register_callback(slow_callback)
+        
+        import threading
+        watcher_thread = threading.Thread(target=watcher.start, daemon=True)
+        watcher_thread.start()
+        
+        time.sleep(0.2)
+        
+        for i in range(3):
+            create_test_message(temp_path, f"concurrent_test_{i}")
+        
+        # Run one after another these would take 1.5s
+        time.sleep(0.9)
+        results.assert_equal(len(callback_calls), 3, "Slow callbacks ran concurrently")
+        
+        watcher.stop()
+        watcher_thread.join(timeout=2.0)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        
+        # Default: one callback at a time, in message order
+        watcher = SynapseWatcher(synapse_path=temp_path, poll_interval=0.1)
+        
+        steps = []
+        
+        def two_step_callback(message):
+            steps.append(message.msg_id)
+            time.sleep(0.05)
+            steps.append(message.msg_id)
+        
+        watcher.register_callback(two_step_callback)
+        
+        import threading
+        watcher_thread = threading.Thread(target=watcher.start, daemon=True)
+        watcher_thread.start()
+        
+        time.sleep(0.2)
+        
+        for i in range(3):
+            create_test_message(temp_path, f"serial_test_{i}")
+        
+        time.sleep(0.6)
+        watcher.stop()
+        watcher_thread.join(timeout=2.0)
+        
+        expected = [f"serial_test_{i}" for i in range(3) for _ in range(2)]
+        results.assert_equal(steps, expected, "Default callbacks run serially, in order")
+    
+    return results.summary()
+
+
+def test_async_callback():
+    """Test that async callbacks are awaited on the watcher's event loop."""
+    print("\n[TEST] Async Callback")
+    results = TestResults()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        
+        watcher = SynapseWatcher(synapse_path=temp_path, poll_interval=0.1)
+        
+        callback_calls = []
+        
+        async def async_callback(message):
+            await asyncio.sleep(0.01)
+            callback_calls.append(message.msg_id)
+        
+        async def crashing_async_callback(message):
+            raise ValueError("Intentional crash!")
+        
+        # Object with an async __call__, and a plain function returning a coroutine
+        class AsyncHandler:
+            async def __call__(self, message):
+                callback_calls.append("handler:" + message.msg_id)
+        
+        def returns_coroutine(message):
+            async def later():
+                callback_calls.append("returned:" + message.msg_id)
+            return later()
+        
+        watcher.register_callback(crashing_async_callback)
+        watcher.register_callback(async_callback)
+        watcher.register_callback(AsyncHandler())
+        watcher.register_callback(returns_coroutine)
+        
+        import threading
+        watcher_thread = threading.Thread(target=watcher.start, daemon=True)
+        watcher_thread.start()
+        
+        time.sleep(0.2)
+        
+        create_test_message(temp_path, "async_test_001")
+        
+        time.sleep(0.3)
+        
+        watcher.stop()
+        watcher_thread.join(timeout=2.0)
+        
+        results.assert_equal(sorted(callback_calls),
+                             ["async_test_001", "handler:async_test_001", "returned:async_test_001"],
+                             "Async callables and returned coroutines awaited despite other crash")
+    
+    return results.summary()
+
+
+def test_rename_detection():
+    """Test that messages moved into the folder are detected."""
+    print("\n[TEST] Rename Detection")
+    results = TestResults()
+    
+    with tempfile.TemporaryDirectory() as temp_dir, tempfile.TemporaryDirectory() as staging_dir:
+        temp_path = Path(temp_dir)
+        
+        # Create watcher
+        watcher = SynapseWatcher(synapse_path=temp_path, poll_interval=0.1)
+        
+        callback_calls = []
+        
+        def test_callback(message):
+            callback_calls.append(message.msg_id)
+        
+        watcher.register_callback(test_callback)
+        
+        # Start watcher
+        import threading
+        watcher_thread = threading.Thread(target=watcher.start, daemon=True)
+        watcher_thread.start()
+        
+        time.sleep(0.2)
+        
+        # Write elsewhere, then atomically move into the watched folder
+        staged = create_test_message(Path(staging_dir), "rename_test_001")
+        shutil.move(str(staged), str(temp_path / staged.name))
+        
+        time.sleep(0.3)
+        
+        # Hard links raise no event inotify watches - the backup rescan finds them
+        staged = create_test_message(Path(staging_dir), "rename_test_002")
+        os.link(staged, temp_path / staged.name)
+        
+        time.sleep(0.3)
+        
+        # Stop watcher
+        watcher.stop()
+        time.sleep(0.2)
+        
+        results.assert_equal(callback_calls, ["rename_test_001", "rename_test_002"],
+                             "Moved-in and hard-linked messages detected once")
+    
+    return results.summary()
+
+
+def test_forced_polling():
+    """Test watching with use_inotify=False, which runs the polling loop."""
+    print("\n[TEST] Forced Polling")
+    results = TestResults()
+    
+    with tempfile.TemporaryDirectory() as temp_dir, tempfile.TemporaryDirectory() as staging_dir:
+        temp_path = Path(temp_dir)
+        create_test_message(temp_path, "poll_test_000")
+        
+        watcher = SynapseWatcher(synapse_path=temp_path, poll_interval=0.1, use_inotify=False)
+        
+        callback_calls = []
+        
+        def test_callback(message):
+            callback_calls.append(message.msg_id)
+        
+        watcher.register_callback(test_callback)
+        
+        import threading
+        watcher_thread = threading.Thread(target=watcher.start, daemon=True)
+        watcher_thread.start()
+        
+        time.sleep(0.2)
+        
+        create_test_message(temp_path, "poll_test_001")
+        time.sleep(0.3)
+        staged = create_test_message(Path(staging_dir), "poll_test_002")
+        shutil.move(str(staged), str(temp_path / staged.name))
+        time.sleep(0.3)
+        
+        watcher.stop()
+        watcher_thread.join(timeout=2.0)
+        
+        results.assert_equal(callback_calls, ["poll_test_001", "poll_test_002"],
+                             "New messages polled once, existing one skipped")
+        results.assert_true(not watcher_thread.is_alive(), "Polling loop stopped")
+    
+    return results.summary()
+
+
+def test_stop_latency():
+    """Test that stop() wakes the watcher without waiting a poll cycle."""
+    print("\n[TEST] Stop Latency")
+    results = TestResults()
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        
+        # Long poll interval - stop() must not wait for it
+        watcher = SynapseWatcher(synapse_path=temp_path, poll_interval=30.0)
+        
+        import threading
+        watcher_thread = threading.Thread(target=watcher.start, daemon=True)
+        watcher_thread.start()
+        
+        time.sleep(0.2)
+        
+        start = time.time()
+        watcher.stop()
+        watcher_thread.join(timeout=2.0)
+        
+        results.assert_true(not watcher_thread.is_alive(), "Watcher thread exited")
+        results.assert_true(time.time() - start < 1.0, "Stopped well within poll interval")
+    
+    return results.summary()
+
+
+def test_multi_source():
+    """Test that mirrored folders deliver each message once."""
+    print("\n[TEST] Multi-Source Watching")
+    results = TestResults()
+    
+    with tempfile.TemporaryDirectory() as primary_dir, tempfile.TemporaryDirectory() as backup_dir:
+        primary = Path(primary_dir)
+        backup = Path(backup_dir)
+        
+        watcher = MultiSourceWatcher({"primary": primary, "backup": backup}, poll_interval=0.1)
+        
+        callback_calls = []
+        
+        def test_callback(message):
+            callback_calls.append(message.msg_id)
+        
+        watcher.register_callback(test_callback)
+        
+        # Capture the delivery log lines
+        logged = []
+        log_handler = logging.Handler(logging.INFO)
+        log_handler.emit = lambda record: logged.append(record.getMessage())
+        logging.getLogger('SynapseWatcher').addHandler(log_handler)
+        
+        import threading
+        watcher_thread = threading.Thread(target=watcher.start, daemon=True)
+        watcher_thread.start()
+        
+        time.sleep(0.2)
+        
+        # Same message in both folders, plus one only the backup has
+        create_test_message(primary, "mirror_test_001")
+        create_test_message(backup, "mirror_test_001")
+        create_test_message(backup, "mirror_test_002")
+        
+        time.sleep(0.3)
+        
+        watcher.stop()
+        watcher_thread.join(timeout=2.0)
+        logging.getLogger('SynapseWatcher').removeHandler(log_handler)
+        
+        results.assert_equal(sorted(callback_calls), ["mirror_test_001", "mirror_test_002"],
+                             "Each message delivered once across folders")
+        results.assert_equal(sum(line.startswith("NEW MESSAGE: mirror_test_001") for line in logged), 1,
+                             "Mirrored message logged once")
+        results.assert_true(not watcher_thread.is_alive(), "All folders stopped")
+    
+    return results.summary()
+
+
 def run_all_tests():
     """Run all tests."""
     print("\n" + "="*60)
@@ -310,9 +792,18 @@ def run_all_tests():
     
     all_passed &= test_message_loading()
     all_passed &= test_message_filter()
+    all_passed &= test_message_prefilter()
     all_passed &= test_callback_execution()
     all_passed &= test_deduplication()
+    all_passed &= test_seen_cache_bounded()
+    all_passed &= test_polling_scan()
     all_passed &= test_error_handling()
+    all_passed &= test_concurrent_callbacks()
+    all_passed &= test_async_callback()
+    all_passed &= test_rename_detection()
+    all_passed &= test_forced_polling()
+    all_passed &= test_stop_latency()
+    all_passed &= test_multi_source()
     
     print("\n" + "="*60)
     if all_passed: